@@ -6,12 +6,56 @@ import sys
 from pathlib import Path
 import zipfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.utils.config import RAW_DATA_DIR
 
 
+def _extract_members(zip_path: Path, names: list, dest_dir: Path):
+    """
+    Extract a subset of archive members using a private ZipFile handle
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for name in names:
+            zip_ref.extract(name, dest_dir)
+
+
+def extract_zip(zip_path: Path, dest_dir: Path, max_workers: int = None):
+    """
+    Extract a zip archive using a thread pool
+    
+    ZipFile handles are not safe to share across threads, so each worker
+    opens its own handle and extracts an interleaved slice of the members.
+    zlib releases the GIL while inflating, so the workers run in parallel.
+    
+    Args:
+        zip_path: Path to the zip archive
+        dest_dir: Directory to extract into
+        max_workers: Number of extraction threads (defaults to CPU count)
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        names = zip_ref.namelist()
+    
+    # Create parent directories up front so workers don't race on makedirs
+    # (dropping '..' and '.' components the same way ZipFile.extract does)
+    for name in names:
+        parts = [p for p in name.split('/')[:-1] if p not in ('', '.', '..')]
+        Path(dest_dir, *parts).mkdir(parents=True, exist_ok=True)
+    
+    files = [name for name in names if not name.endswith('/')]
+    chunks = [files[i::max_workers] for i in range(max_workers) if files[i::max_workers]]
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_extract_members, zip_path, chunk, dest_dir) for chunk in chunks]
+        for future in futures:
+            future.result()
+
+
 def download_dataset():
     """
     Download the Cats and Dogs dataset
@@ -52,8 +96,7 @@ def download_dataset():
         
         for zip_file in zip_files:
             print(f"Extracting {zip_file.name}...")
-            with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-                zip_ref.extractall(RAW_DATA_DIR)
+            extract_zip(zip_file, RAW_DATA_DIR)
             
             # Remove zip file after extraction
             zip_file.unlink()
@@ -61,8 +104,7 @@ def download_dataset():
         # Further extract train.zip if it exists
         train_zip = RAW_DATA_DIR / "train.zip"
         if train_zip.exists():
-            with zipfile.ZipFile(train_zip, 'r') as zip_ref:
-                zip_ref.extractall(RAW_DATA_DIR)
+            extract_zip(train_zip, RAW_DATA_DIR)
             train_zip.unlink()
         
         print("\n✓ Dataset downloaded and extracted successfully!")
@@ -2,9 +2,52 @@
 Data augmentation utilities
 """
 import torch
+import torch.nn as nn
+import torch.nn.functional as F
 from torchvision import transforms
 from typing import Tuple
 
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+class FusedResizeNormalize(nn.Module):
+    """
+    Resize + scale to [0, 1] + normalize in a single module
+
+    Takes a uint8 CHW (or NCHW) tensor, e.g. from
+    ``transforms.functional.pil_to_tensor``, and returns a normalized
+    float32 NCHW tensor. The float conversion happens once, and the
+    scale/normalize steps run in-place on the resized output instead of
+    allocating a new tensor per transform as Resize -> ToTensor -> Normalize does.
+    """
+
+    def __init__(self, img_size: Tuple[int, int] = (224, 224)):
+        """
+        Initialize the module
+
+        Args:
+            img_size: Target image size (height, width)
+        """
+        super(FusedResizeNormalize, self).__init__()
+        self.img_size = tuple(img_size)
+        self.register_buffer("mean", torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1))
+        self.register_buffer("std", torch.tensor(IMAGENET_STD).view(1, 3, 1, 1))
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Args:
+            x: uint8 tensor of shape (3, H, W) or (batch_size, 3, H, W)
+
+        Returns:
+            float32 tensor of shape (batch_size, 3, img_size[0], img_size[1])
+        """
+        if x.dim() == 3:
+            x = x.unsqueeze(0)
+        x = x.to(torch.float32)
+        x = F.interpolate(x, size=self.img_size, mode="bilinear", align_corners=False, antialias=True)
+        return x.div_(255.0).sub_(self.mean).div_(self.std)
+
 
 def get_train_transforms(img_size: Tuple[int, int] = (224, 224)):
     """
@@ -24,7 +67,7 @@ def get_train_transforms(img_size: Tuple[int, int] = (224, 224)):
         transforms.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2, hue=0.1),
         transforms.RandomPerspective(distortion_scale=0.2, p=0.5),
         transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
     ])
 
 
@@ -41,18 +84,18 @@ def get_val_transforms(img_size: Tuple[int, int] = (224, 224)):
     return transforms.Compose([
         transforms.Resize(img_size),
         transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
     ])
 
 
 def get_inference_transforms(img_size: Tuple[int, int] = (224, 224)):
     """
-    Get inference transforms (same as validation)
+    Get inference transforms (same preprocessing as validation, fused)
     
     Args:
         img_size: Target image size (height, width)
         
     Returns:
-        torchvision transforms composition
+        FusedResizeNormalize module operating on uint8 image tensors
     """
-    return get_val_transforms(img_size)
+    return FusedResizeNormalize(img_size)
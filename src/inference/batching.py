@@ -0,0 +1,130 @@
+"""
+Micro-batching of concurrent prediction requests
+"""
+import asyncio
+import logging
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces preprocessed images from concurrent requests into one forward pass
+
+    Requests submit a (1, 3, H, W) tensor and await a future. A single
+    background task collects whatever arrives within ``max_wait_ms`` of
+    the first queued item (up to ``max_batch_size``), runs one batched
+    forward pass and resolves every future with its own result.
+    """
+
+    def __init__(self, predictor, max_batch_size: int = 16, max_wait_ms: float = 8.0):
+        """
+        Initialize the batcher
+
+        Args:
+            predictor: CatDogPredictor used to run the batched forward pass
+            max_batch_size: Maximum number of images per forward pass
+            max_wait_ms: How long to wait for more requests after the first one
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = None
+        self._task = None
+        # Requests taken off the queue but not yet resolved
+        self._pending = []
+
+    def start(self):
+        """
+        Start the background batching task on the running event loop
+        """
+        self.queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Cancel the background batching task and fail any waiting requests
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Nothing will serve these any more; don't leave callers waiting
+        pending = self._pending
+        self._pending = []
+        while self.queue is not None and not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        error = RuntimeError("MicroBatcher stopped")
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    async def submit(self, tensor: torch.Tensor) -> dict:
+        """
+        Queue a preprocessed image and wait for its prediction
+
+        Args:
+            tensor: Preprocessed tensor of shape (1, 3, H, W)
+
+        Returns:
+            Prediction dictionary (see CatDogPredictor.predict)
+        """
+        if self._task is None:
+            raise RuntimeError("MicroBatcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((tensor, future))
+        return await future
+
+    async def _collect(self) -> list:
+        """
+        Wait for one request, then gather more until the batch window closes
+        """
+        loop = asyncio.get_running_loop()
+        # Collect into _pending so stop() can fail items gathered so far
+        items = self._pending
+        items.append(await self.queue.get())
+        deadline = loop.time() + self.max_wait
+
+        while len(items) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return items
+
+    async def _run(self):
+        """
+        Batching loop: collect, run one forward pass, resolve futures
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            items = await self._collect()
+
+            try:
+                batch = torch.cat([tensor for tensor, _ in items])
+                # Run the forward pass off the event loop so requests keep queueing
+                results = await loop.run_in_executor(None, self.predictor.predict_tensor, batch)
+            except Exception as e:
+                # Fail this batch only; the loop keeps serving later requests
+                logger.error(f"Batched inference failed for {len(items)} requests: {e}")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                self._pending = []
+                continue
+
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+            self._pending = []
@@ -11,18 +11,21 @@ class CatDogCNN(nn.Module):
     Convolutional Neural Network for Cats vs Dogs classification
     
     Architecture:
-    - 3 Convolutional blocks (Conv2D -> BatchNorm -> ReLU -> MaxPool)
+    - 4 Convolutional blocks (Conv2D -> BatchNorm -> ReLU -> MaxPool)
+    - Global average pooling
     - Fully connected layers
     - Dropout for regularization
     """
     
-    def __init__(self, num_classes: int = 2, dropout: float = 0.5):
+    def __init__(self, num_classes: int = 2, dropout: float = 0.5, global_pool: bool = True):
         """
         Initialize the CNN model
         
         Args:
             num_classes: Number of output classes
             dropout: Dropout probability
+            global_pool: Average-pool the last feature map before fc1. Set to
+                False to load checkpoints trained on the flattened 256x14x14 map
         """
         super(CatDogCNN, self).__init__()
         
@@ -46,9 +49,12 @@ class CatDogCNN(nn.Module):
         self.bn4 = nn.BatchNorm2d(256)
         self.pool4 = nn.MaxPool2d(kernel_size=2, stride=2)
         
+        # Global average pooling: 256 x 14 x 14 -> 256 x 1 x 1
+        self.gap = nn.AdaptiveAvgPool2d(1) if global_pool else nn.Identity()
+        
         # Fully Connected Layers
-        # Input size: 256 * 14 * 14 = 50176 (for 224x224 input images)
-        self.fc1 = nn.Linear(256 * 14 * 14, 512)
+        # Input size: 256 with global pooling, 256 * 14 * 14 = 50176 without
+        self.fc1 = nn.Linear(256 if global_pool else 256 * 14 * 14, 512)
         self.dropout1 = nn.Dropout(dropout)
         self.fc2 = nn.Linear(512, 128)
         self.dropout2 = nn.Dropout(dropout)
@@ -88,8 +94,9 @@ class CatDogCNN(nn.Module):
         x = F.relu(x)
         x = self.pool4(x)
         
-        # Flatten
-        x = x.view(x.size(0), -1)
+        # Global average pool + flatten
+        x = self.gap(x)
+        x = torch.flatten(x, 1)
         
         # Fully connected layers
         x = F.relu(self.fc1(x))
@@ -101,7 +108,9 @@ class CatDogCNN(nn.Module):
         return x
 
 
-def get_model(num_classes: int = 2, dropout: float = 0.5, pretrained: bool = False):
+def get_model(
+    num_classes: int = 2, dropout: float = 0.5, pretrained: bool = False, global_pool: bool = True
+):
     """
     Get the CNN model
     
@@ -109,14 +118,66 @@ def get_model(num_classes: int = 2, dropout: float = 0.5, pretrained: bool = Fal
         num_classes: Number of output classes
         dropout: Dropout probability
         pretrained: Whether to load pretrained weights (not implemented for custom model)
+        global_pool: Whether to use global average pooling before fc1
         
     Returns:
         CNN model instance
     """
-    model = CatDogCNN(num_classes=num_classes, dropout=dropout)
+    model = CatDogCNN(num_classes=num_classes, dropout=dropout, global_pool=global_pool)
+    return model
+
+
+def load_model_from_checkpoint(model_path, num_classes: int = 2, map_location="cpu"):
+    """
+    Build a CNN model and load weights from a training checkpoint
+    
+    Accepts both full training checkpoints (with 'model_state_dict') and
+    plain state dicts, with or without global average pooling.
+    
+    Args:
+        model_path: Path to the checkpoint file
+        num_classes: Number of output classes
+        map_location: Device to map the checkpoint tensors onto
+        
+    Returns:
+        CNN model with the checkpoint weights loaded
+    """
+    checkpoint = torch.load(model_path, map_location=map_location)
+    
+    # Handle different checkpoint formats
+    if isinstance(checkpoint, dict) and 'model_state_dict' in checkpoint:
+        state_dict = checkpoint['model_state_dict']
+    else:
+        state_dict = checkpoint
+    
+    # Checkpoints trained before global average pooling have a 50176-wide fc1
+    global_pool = state_dict["fc1.weight"].shape[1] == 256
+    
+    model = get_model(num_classes=num_classes, global_pool=global_pool)
+    model.load_state_dict(state_dict)
     return model
 
 
+def fuse_conv_bn(model: CatDogCNN) -> CatDogCNN:
+    """
+    Fold each BatchNorm into the preceding convolution for inference
+    
+    The BatchNorm modules are replaced with nn.Identity, so forward()
+    is unchanged. The model must be in eval mode.
+    
+    Args:
+        model: CNN model in eval mode
+        
+    Returns:
+        The same model, fused in place
+    """
+    return torch.ao.quantization.fuse_modules(
+        model,
+        [[f"conv{i}", f"bn{i}"] for i in range(1, 5)],
+        inplace=True,
+    )
+
+
 if __name__ == "__main__":
     # Test model
     model = get_model()
@@ -0,0 +1,121 @@
+"""
+ONNX export and ONNX Runtime loading for inference
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import torch
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.models.cnn_model import load_model_from_checkpoint, fuse_conv_bn
+from src.utils.config import MODELS_DIR, NUM_CLASSES, IMG_SIZE
+
+ONNX_SUFFIX = ".onnx"
+ONNX_OPSET = 17
+
+
+def export_onnx(model, output_path, opset_version: int = ONNX_OPSET):
+    """
+    Export a model to ONNX with a dynamic batch dimension
+
+    Args:
+        model: FP32 PyTorch model
+        output_path: Destination .onnx file
+        opset_version: ONNX opset to target
+    """
+    model = model.cpu().eval()
+    fuse_conv_bn(model)
+    dummy_input = torch.randn(1, 3, IMG_SIZE[0], IMG_SIZE[1])
+
+    # Batch stays dynamic so micro-batched requests can share one session
+    torch.onnx.export(
+        model,
+        dummy_input,
+        str(output_path),
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+        opset_version=opset_version,
+    )
+
+
+def is_onnx_model_path(model_path) -> bool:
+    """
+    Check whether a model path points to an ONNX model
+
+    Args:
+        model_path: Path to the model file
+
+    Returns:
+        True if the file has an .onnx extension
+    """
+    return str(model_path).endswith(ONNX_SUFFIX)
+
+
+class OnnxRuntimeModel:
+    """
+    Callable wrapper exposing an ONNX Runtime session like a PyTorch model
+    """
+
+    training = False
+
+    def __init__(self, model_path):
+        """
+        Create the inference session
+
+        Args:
+            model_path: Path to the .onnx file
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError(
+                "onnxruntime is required to serve .onnx models. "
+                "Install it with: pip install onnxruntime (or onnxruntime-gpu)"
+            )
+
+        # Prefer CUDA when the GPU build is installed, otherwise run on CPU
+        providers = [
+            provider for provider in ("CUDAExecutionProvider", "CPUExecutionProvider")
+            if provider in ort.get_available_providers()
+        ]
+        self.session = ort.InferenceSession(str(model_path), providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Run the session on a preprocessed batch
+
+        Args:
+            tensor: Float tensor of shape (batch_size, 3, H, W)
+
+        Returns:
+            Logits tensor of shape (batch_size, num_classes)
+        """
+        outputs = self.session.run(None, {self.input_name: tensor.cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+    def eval(self):
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Cats vs Dogs CNN model to ONNX")
+    parser.add_argument("--model", type=str, default=str(MODELS_DIR / "best_model.pt"), help="Path to FP32 model")
+    parser.add_argument("--output", type=str, default=None, help="Path for the ONNX model")
+    parser.add_argument("--opset", type=int, default=ONNX_OPSET, help="ONNX opset version")
+
+    args = parser.parse_args()
+
+    model = load_model_from_checkpoint(args.model, num_classes=NUM_CLASSES)
+
+    output_path = args.output or str(Path(args.model).with_suffix(ONNX_SUFFIX))
+    export_onnx(model, output_path, opset_version=args.opset)
+    print(f"✓ ONNX model saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
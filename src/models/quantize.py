@@ -0,0 +1,117 @@
+"""
+Post-training int8 quantization for CPU inference
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+from torch.utils.data import DataLoader
+from torchvision import datasets
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.models.cnn_model import load_model_from_checkpoint
+from src.data.augmentation import get_val_transforms
+from src.utils.config import VAL_DIR, MODELS_DIR, BATCH_SIZE, NUM_CLASSES, IMG_SIZE
+
+QUANTIZED_SUFFIX = ".int8.pt"
+
+# FBGEMM provides the x86 int8 kernels (AVX2/AVX-512 VNNI); ARM builds only ship QNNPACK
+if "fbgemm" in torch.backends.quantized.supported_engines:
+    torch.backends.quantized.engine = "fbgemm"
+
+
+def quantize_model(model, calibration_loader, num_batches: int = 4):
+    """
+    Statically quantize a model to int8 using FX graph mode
+
+    Args:
+        model: FP32 PyTorch model
+        calibration_loader: Data loader yielding (inputs, labels) for calibration
+        num_batches: Number of batches used to calibrate activation ranges
+
+    Returns:
+        TorchScript module with int8 weights and activations
+    """
+    model = model.cpu().eval()
+    example_inputs = (torch.randn(1, 3, IMG_SIZE[0], IMG_SIZE[1]),)
+
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs)
+
+    # Calibrate activation observers
+    with torch.inference_mode():
+        for i, (inputs, _) in enumerate(calibration_loader):
+            if i >= num_batches:
+                break
+            prepared(inputs)
+
+    quantized = convert_fx(prepared)
+
+    # Trace so the quantized graph can be loaded without the model source
+    return torch.jit.trace(quantized, example_inputs)
+
+
+def is_quantized_model_path(model_path) -> bool:
+    """
+    Check whether a model path points to a quantized TorchScript model
+
+    Args:
+        model_path: Path to the model file
+
+    Returns:
+        True if the file uses the int8 naming convention
+    """
+    return str(model_path).endswith(QUANTIZED_SUFFIX)
+
+
+def load_quantized_model(model_path):
+    """
+    Load a quantized TorchScript model (CPU only)
+
+    Args:
+        model_path: Path to the .int8.pt file
+
+    Returns:
+        TorchScript module in eval mode
+    """
+    model = torch.jit.load(str(model_path), map_location="cpu")
+    model.eval()
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the Cats vs Dogs CNN model to int8")
+    parser.add_argument("--model", type=str, default=str(MODELS_DIR / "best_model.pt"), help="Path to FP32 model")
+    parser.add_argument("--output", type=str, default=None, help="Path for the quantized model")
+    parser.add_argument("--num_batches", type=int, default=4, help="Number of calibration batches")
+    parser.add_argument("--batch_size", type=int, default=BATCH_SIZE, help="Calibration batch size")
+
+    args = parser.parse_args()
+
+    if not VAL_DIR.exists():
+        print("Error: Processed validation data not found!")
+        print("Please run: python src/data/preprocess.py")
+        sys.exit(1)
+
+    # Load FP32 weights
+    model = load_model_from_checkpoint(args.model, num_classes=NUM_CLASSES)
+
+    # Calibrate on validation images
+    val_dataset = datasets.ImageFolder(VAL_DIR, transform=get_val_transforms(IMG_SIZE))
+    calibration_loader = DataLoader(val_dataset, batch_size=args.batch_size, shuffle=True)
+
+    print(f"Calibrating on {args.num_batches} batches of {args.batch_size} images...")
+    quantized = quantize_model(model, calibration_loader, num_batches=args.num_batches)
+
+    output_path = args.output or str(Path(args.model).with_suffix("")) + QUANTIZED_SUFFIX
+    torch.jit.save(quantized, output_path)
+    print(f"✓ Quantized model saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
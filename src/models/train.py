@@ -2,6 +2,7 @@
 Model training script with MLflow tracking
 """
 import argparse
+import contextlib
 import os
 import sys
 from pathlib import Path
@@ -11,7 +12,10 @@ from datetime import datetime
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel as DDP
 from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
 from torchvision import datasets
 import mlflow
 import mlflow.pytorch
@@ -34,6 +38,7 @@ from src.utils.config import (
     CLASS_NAMES,
     IMG_SIZE,
     MLFLOW_EXPERIMENT_NAME,
+    ensure_dirs,
 )
 from src.utils.metrics import (
     calculate_metrics,
@@ -43,13 +48,32 @@ from src.utils.metrics import (
     print_classification_report,
 )
 
+# Allow TF32 matmuls/convs on Ampere+ even outside autocast
+torch.set_float32_matmul_precision("high")
 
-def get_data_loaders(batch_size: int = BATCH_SIZE):
+
+def _memory_format(device) -> torch.memory_format:
+    """
+    NHWC (channels_last) conv kernels are faster on CUDA tensor cores
+    """
+    return torch.channels_last if device.type == "cuda" else torch.contiguous_format
+
+
+DEFAULT_NUM_WORKERS = min(8, os.cpu_count() or 2)
+
+
+def get_data_loaders(
+    batch_size: int = BATCH_SIZE,
+    num_workers: int = DEFAULT_NUM_WORKERS,
+    distributed: bool = False,
+):
     """
     Create data loaders for training, validation, and testing
     
     Args:
-        batch_size: Batch size for data loaders
+        batch_size: Batch size for data loaders (per process when distributed)
+        num_workers: Number of data loading worker processes
+        distributed: Shard the training set across processes with a DistributedSampler
         
     Returns:
         Tuple of (train_loader, val_loader, test_loader)
@@ -70,35 +94,97 @@ def get_data_loaders(batch_size: int = BATCH_SIZE):
         transform=get_val_transforms(IMG_SIZE)
     )
     
+    # Keep workers alive across epochs and decode batches ahead of the GPU
+    loader_kwargs = {"num_workers": num_workers, "pin_memory": True}
+    if num_workers > 0:
+        loader_kwargs.update(persistent_workers=True, prefetch_factor=4)
+    
+    # Each rank sees a disjoint shard; the sampler does the shuffling
+    train_sampler = DistributedSampler(train_dataset) if distributed else None
+    
     # Create data loaders
     train_loader = DataLoader(
         train_dataset,
         batch_size=batch_size,
-        shuffle=True,
-        num_workers=2,
-        pin_memory=True
+        shuffle=train_sampler is None,
+        sampler=train_sampler,
+        **loader_kwargs
     )
     
     val_loader = DataLoader(
         val_dataset,
         batch_size=batch_size,
         shuffle=False,
-        num_workers=2,
-        pin_memory=True
+        **loader_kwargs
     )
     
     test_loader = DataLoader(
         test_dataset,
         batch_size=batch_size,
         shuffle=False,
-        num_workers=2,
-        pin_memory=True
+        **loader_kwargs
     )
     
     return train_loader, val_loader, test_loader
 
 
-def train_epoch(model, train_loader, criterion, optimizer, device):
+class CUDAPrefetcher:
+    """
+    Iterate a data loader with host-to-device copies on a side CUDA stream
+    
+    The copy of batch N+1 is queued on its own stream before batch N is
+    handed to the caller, so PCIe transfers overlap with compute on the
+    default stream. On non-CUDA devices batches are simply moved in order.
+    """
+    
+    def __init__(self, loader, device, memory_format=torch.contiguous_format):
+        """
+        Args:
+            loader: DataLoader yielding (inputs, labels) from pinned memory
+            device: Device to move batches to
+            memory_format: Memory format for the input tensors
+        """
+        self.loader = loader
+        self.device = device
+        self.memory_format = memory_format
+        self.stream = torch.cuda.Stream(device) if device.type == "cuda" else None
+    
+    def __len__(self):
+        return len(self.loader)
+    
+    def _to_device(self, inputs, labels):
+        inputs = inputs.to(self.device, non_blocking=True, memory_format=self.memory_format)
+        labels = labels.to(self.device, non_blocking=True)
+        return inputs, labels
+    
+    def _preload(self, loader_iter):
+        try:
+            inputs, labels = next(loader_iter)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(self.stream):
+            return self._to_device(inputs, labels)
+    
+    def __iter__(self):
+        if self.stream is None:
+            for inputs, labels in self.loader:
+                yield self._to_device(inputs, labels)
+            return
+        
+        loader_iter = iter(self.loader)
+        next_batch = self._preload(loader_iter)
+        while next_batch is not None:
+            compute_stream = torch.cuda.current_stream(self.device)
+            compute_stream.wait_stream(self.stream)
+            inputs, labels = next_batch
+            # Keep the allocator from reusing these buffers while compute still reads them
+            inputs.record_stream(compute_stream)
+            labels.record_stream(compute_stream)
+            next_batch = self._preload(loader_iter)
+            yield inputs, labels
+
+
+def train_epoch(model, train_loader, criterion, optimizer, device, scaler=None):
     """
     Train for one epoch
     
@@ -108,37 +194,52 @@ def train_epoch(model, train_loader, criterion, optimizer, device):
         criterion: Loss function
         optimizer: Optimizer
         device: Device to train on
+        scaler: Optional GradScaler; when enabled, forward/loss run in float16 autocast
         
     Returns:
         Tuple of (average_loss, accuracy)
     """
     model.train()
-    running_loss = 0.0
-    correct = 0
+    # Accumulate on device so the loop never waits on the GPU
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), device=device, dtype=torch.long)
     total = 0
+    use_amp = scaler is not None and scaler.is_enabled()
     
-    for inputs, labels in train_loader:
-        inputs, labels = inputs.to(device), labels.to(device)
-        
+    # Batches arrive on the device, copied asynchronously from pinned loader memory
+    for inputs, labels in CUDAPrefetcher(train_loader, device, _memory_format(device)):
         # Zero gradients
-        optimizer.zero_grad()
+        optimizer.zero_grad(set_to_none=True)
         
-        # Forward pass
-        outputs = model(inputs)
-        loss = criterion(outputs, labels)
+        # Forward pass (mixed precision on CUDA)
+        with torch.autocast(device_type=device.type, dtype=torch.float16, enabled=use_amp):
+            outputs = model(inputs)
+            loss = criterion(outputs, labels)
         
         # Backward pass and optimization
-        loss.backward()
-        optimizer.step()
+        if use_amp:
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
+        else:
+            loss.backward()
+            optimizer.step()
         
         # Statistics
-        running_loss += loss.item() * inputs.size(0)
-        _, predicted = torch.max(outputs, 1)
+        loss_sum += loss.detach() * inputs.size(0)
+        predicted = outputs.argmax(dim=1)
         total += labels.size(0)
-        correct += (predicted == labels).sum().item()
+        correct += (predicted == labels).sum()
+    
+    # Each DDP rank only sees its shard; sum the statistics across ranks
+    stats = torch.stack([loss_sum, correct.float(), torch.tensor(float(total), device=device)])
+    if dist.is_available() and dist.is_initialized():
+        dist.all_reduce(stats)
     
-    epoch_loss = running_loss / total
-    epoch_acc = correct / total
+    # Single sync at the end of the epoch
+    loss_total, correct_total, count = stats.tolist()
+    epoch_loss = loss_total / count
+    epoch_acc = correct_total / count
     
     return epoch_loss, epoch_acc
 
@@ -157,33 +258,35 @@ def validate(model, val_loader, criterion, device):
         Tuple of (average_loss, accuracy, predictions, true_labels)
     """
     model.eval()
-    running_loss = 0.0
-    correct = 0
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), device=device, dtype=torch.long)
     total = 0
-    all_preds = []
-    all_labels = []
+    preds_chunks = []
+    labels_chunks = []
     
-    with torch.no_grad():
-        for inputs, labels in val_loader:
-            inputs, labels = inputs.to(device), labels.to(device)
-            
-            # Forward pass
-            outputs = model(inputs)
-            loss = criterion(outputs, labels)
+    with torch.inference_mode():
+        for inputs, labels in CUDAPrefetcher(val_loader, device, _memory_format(device)):
+            # Forward pass (mixed precision on CUDA)
+            with torch.autocast(device_type=device.type, dtype=torch.float16, enabled=device.type == "cuda"):
+                outputs = model(inputs)
+                loss = criterion(outputs, labels)
             
             # Statistics
-            running_loss += loss.item() * inputs.size(0)
-            _, predicted = torch.max(outputs, 1)
+            loss_sum += loss * inputs.size(0)
+            predicted = outputs.argmax(dim=1)
             total += labels.size(0)
-            correct += (predicted == labels).sum().item()
+            correct += (predicted == labels).sum()
             
-            all_preds.extend(predicted.cpu().numpy())
-            all_labels.extend(labels.cpu().numpy())
+            # Keep predictions on device; copied to host once after the loop
+            preds_chunks.append(predicted)
+            labels_chunks.append(labels)
     
-    epoch_loss = running_loss / total
-    epoch_acc = correct / total
+    epoch_loss = (loss_sum / total).item()
+    epoch_acc = (correct.float() / total).item()
+    all_preds = torch.cat(preds_chunks).cpu().numpy()
+    all_labels = torch.cat(labels_chunks).cpu().numpy()
     
-    return epoch_loss, epoch_acc, np.array(all_preds), np.array(all_labels)
+    return epoch_loss, epoch_acc, all_preds, all_labels
 
 
 def train_model(args):
@@ -193,35 +296,85 @@ def train_model(args):
     Args:
         args: Command line arguments
     """
-    # Set device
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device: {device}")
+    # Multi-GPU when launched with torchrun (WORLD_SIZE > 1), otherwise single device
+    world_size = int(os.environ.get("WORLD_SIZE", 1))
+    distributed = world_size > 1
+    if distributed:
+        dist.init_process_group("nccl")
+        local_rank = int(os.environ.get("LOCAL_RANK", args.local_rank))
+        torch.cuda.set_device(local_rank)
+        device = torch.device("cuda", local_rank)
+    else:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     
-    # Set MLflow experiment
-    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+    # Input shape is fixed, so cuDNN autotuning runs once and is reused
+    if device.type == "cuda":
+        torch.backends.cudnn.benchmark = True
+    
+    # Only rank 0 logs to MLflow and writes checkpoints
+    is_main = not distributed or dist.get_rank() == 0
+    if is_main:
+        print(f"Using device: {device} (world size: {world_size})")
+        ensure_dirs([MODELS_DIR])
+        
+        # Set MLflow experiment
+        mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
     
     # Start MLflow run
-    with mlflow.start_run(run_name=f"cnn_training_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
+    run_context = (
+        mlflow.start_run(run_name=f"cnn_training_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        if is_main else contextlib.nullcontext()
+    )
+    with run_context:
         # Log parameters
-        mlflow.log_param("model_architecture", "Custom CNN")
-        mlflow.log_param("batch_size", args.batch_size)
-        mlflow.log_param("epochs", args.epochs)
-        mlflow.log_param("learning_rate", args.learning_rate)
-        mlflow.log_param("optimizer", "Adam")
-        mlflow.log_param("image_size", IMG_SIZE)
-        mlflow.log_param("dropout", args.dropout)
+        if is_main:
+            mlflow.log_params({
+                "model_architecture": "Custom CNN",
+                "batch_size": args.batch_size,
+                "epochs": args.epochs,
+                "learning_rate": args.learning_rate,
+                "optimizer": "Adam",
+                "image_size": IMG_SIZE,
+                "dropout": args.dropout,
+                "num_workers": args.num_workers,
+                "world_size": world_size,
+                "patience": args.patience,
+            })
         
         # Get data loaders
-        print("Loading data...")
-        train_loader, val_loader, test_loader = get_data_loaders(args.batch_size)
-        print(f"Training samples: {len(train_loader.dataset)}")
-        print(f"Validation samples: {len(val_loader.dataset)}")
-        print(f"Test samples: {len(test_loader.dataset)}")
-        
-        # Create model
-        print("\nCreating model...")
+        train_loader, val_loader, test_loader = get_data_loaders(
+            args.batch_size, args.num_workers, distributed=distributed
+        )
+        if is_main:
+            print("Loading data...")
+            print(f"Training samples: {len(train_loader.dataset)}")
+            print(f"Validation samples: {len(val_loader.dataset)}")
+            print(f"Test samples: {len(test_loader.dataset)}")
+            
+            # Create model
+            print("\nCreating model...")
         model = get_model(num_classes=NUM_CLASSES, dropout=args.dropout)
-        model = model.to(device)
+        model = model.to(device, memory_format=_memory_format(device))
+        
+        # Keep a handle on the eager module for checkpointing and MLflow logging
+        base_model = model
+        if distributed:
+            # Gradient AllReduce runs in buckets overlapped with backward
+            model = DDP(model, device_ids=[local_rank], gradient_as_bucket_view=True)
+        if device.type == "cuda":
+            eager_model = model
+            try:
+                model = torch.compile(model)
+                # Compilation is lazy; run one forward so backend failures surface here
+                dummy = torch.zeros(
+                    2, 3, IMG_SIZE, IMG_SIZE, device=device
+                ).to(memory_format=_memory_format(device))
+                model.eval()
+                with torch.no_grad(), torch.autocast(device_type="cuda", dtype=torch.float16):
+                    model(dummy)
+            except Exception as e:
+                print(f"torch.compile unavailable, training in eager mode: {e}")
+                model = eager_model
         
         # Loss and optimizer
         criterion = nn.CrossEntropyLoss()
@@ -230,26 +383,33 @@ def train_model(args):
             optimizer, mode='min', factor=0.5, patience=3
         )
         
-        # Training history
+        # Mixed precision: float16 tensor cores on CUDA, plain FP32 elsewhere
+        scaler = torch.cuda.amp.GradScaler(enabled=device.type == "cuda")
+        if is_main:
+            mlflow.log_param("mixed_precision", scaler.is_enabled())
+        
+        # Training history, preallocated per epoch (NaN until filled)
         history = {
-            "train_loss": [],
-            "train_acc": [],
-            "val_loss": [],
-            "val_acc": []
+            key: np.full(args.epochs, np.nan, dtype=np.float32)
+            for key in ("train_loss", "train_acc", "val_loss", "val_acc")
         }
         
         best_val_acc = 0.0
+        epochs_without_improvement = 0
         
         # Training loop
-        print(f"\nStarting training for {args.epochs} epochs...")
+        if is_main:
+            print(f"\nStarting training for {args.epochs} epochs...")
         start_time = time.time()
         
         for epoch in range(args.epochs):
             epoch_start = time.time()
+            if isinstance(train_loader.sampler, DistributedSampler):
+                train_loader.sampler.set_epoch(epoch)
             
             # Train
             train_loss, train_acc = train_epoch(
-                model, train_loader, criterion, optimizer, device
+                model, train_loader, criterion, optimizer, device, scaler
             )
             
             # Validate
@@ -261,16 +421,37 @@ def train_model(args):
             scheduler.step(val_loss)
             
             # Save history
-            history["train_loss"].append(train_loss)
-            history["train_acc"].append(train_acc)
-            history["val_loss"].append(val_loss)
-            history["val_acc"].append(val_acc)
+            history["train_loss"][epoch] = train_loss
+            history["train_acc"][epoch] = train_acc
+            history["val_loss"][epoch] = val_loss
+            history["val_acc"][epoch] = val_acc
+            
+            # Early stopping on validation accuracy (patience 0 disables it)
+            improved = val_acc > best_val_acc
+            if improved:
+                best_val_acc = val_acc
+                epochs_without_improvement = 0
+            else:
+                epochs_without_improvement += 1
+            stop_early = 0 < args.patience <= epochs_without_improvement
+            if distributed:
+                # Rank 0 decides so every process leaves the loop together
+                stop_flag = torch.tensor(int(stop_early), device=device)
+                dist.broadcast(stop_flag, src=0)
+                stop_early = bool(stop_flag.item())
             
-            # Log metrics to MLflow
-            mlflow.log_metric("train_loss", train_loss, step=epoch)
-            mlflow.log_metric("train_acc", train_acc, step=epoch)
-            mlflow.log_metric("val_loss", val_loss, step=epoch)
-            mlflow.log_metric("val_acc", val_acc, step=epoch)
+            if not is_main:
+                if stop_early:
+                    break
+                continue
+            
+            # Log metrics to MLflow (one request per epoch)
+            mlflow.log_metrics({
+                "train_loss": train_loss,
+                "train_acc": train_acc,
+                "val_loss": val_loss,
+                "val_acc": val_acc,
+            }, step=epoch)
             
             epoch_time = time.time() - epoch_start
             
@@ -279,26 +460,34 @@ def train_model(args):
             print(f"  Val Loss: {val_loss:.4f} | Val Acc: {val_acc:.4f}")
             
             # Save best model
-            if val_acc > best_val_acc:
-                best_val_acc = val_acc
+            if improved:
                 model_path = MODELS_DIR / "best_model.pt"
                 torch.save({
                     'epoch': epoch,
-                    'model_state_dict': model.state_dict(),
+                    'model_state_dict': base_model.state_dict(),
                     'optimizer_state_dict': optimizer.state_dict(),
                     'val_acc': val_acc,
                     'val_loss': val_loss,
                 }, model_path)
                 print(f"  ✓ New best model saved! (Val Acc: {val_acc:.4f})")
+            
+            if stop_early:
+                print(f"\nEarly stopping: no improvement in Val Acc for {args.patience} epochs")
+                break
+        
+        # Other ranks are done once the training loop finishes
+        if not is_main:
+            dist.destroy_process_group()
+            return
         
         total_time = time.time() - start_time
         print(f"\nTraining completed in {total_time/60:.2f} minutes")
         print(f"Best validation accuracy: {best_val_acc:.4f}")
         
-        # Test evaluation
+        # Test evaluation; only rank 0 is left, so bypass the DDP wrapper
         print("\nEvaluating on test set...")
         test_loss, test_acc, test_preds, test_labels = validate(
-            model, test_loader, criterion, device
+            base_model if distributed else model, test_loader, criterion, device
         )
         
         print(f"Test Loss: {test_loss:.4f}")
@@ -309,10 +498,10 @@ def train_model(args):
         print(f"\nTest Metrics:")
         for metric, value in test_metrics.items():
             print(f"  {metric}: {value:.4f}")
-            mlflow.log_metric(f"test_{metric}", value)
+        mlflow.log_metrics({f"test_{metric}": value for metric, value in test_metrics.items()})
         
         # Confusion matrix
-        cm = get_confusion_matrix(test_labels, test_preds)
+        cm = get_confusion_matrix(test_labels, test_preds, num_classes=NUM_CLASSES)
         cm_fig = plot_confusion_matrix(cm, CLASS_NAMES, save_path=MODELS_DIR / "confusion_matrix.png")
         mlflow.log_figure(cm_fig, "confusion_matrix.png")
         
@@ -324,14 +513,17 @@ def train_model(args):
         print_classification_report(test_labels, test_preds, CLASS_NAMES)
         
         # Log model to MLflow
-        mlflow.pytorch.log_model(model, "model")
+        mlflow.pytorch.log_model(base_model, "model")
         
         # Save final model
         final_model_path = MODELS_DIR / "final_model.pt"
-        torch.save(model.state_dict(), final_model_path)
+        torch.save(base_model.state_dict(), final_model_path)
         mlflow.log_artifact(str(final_model_path))
         
         print(f"\n✓ Training complete! Model saved to {MODELS_DIR}")
+    
+    if distributed:
+        dist.destroy_process_group()
 
 
 def main():
@@ -340,6 +532,11 @@ def main():
     parser.add_argument("--epochs", type=int, default=EPOCHS, help="Number of epochs")
     parser.add_argument("--learning_rate", type=float, default=LEARNING_RATE, help="Learning rate")
     parser.add_argument("--dropout", type=float, default=0.5, help="Dropout rate")
+    parser.add_argument("--num_workers", type=int, default=DEFAULT_NUM_WORKERS, help="Data loader worker processes")
+    parser.add_argument("--patience", type=int, default=7,
+                        help="Stop after this many epochs without Val Acc improvement (0 disables)")
+    parser.add_argument("--local_rank", type=int, default=int(os.environ.get("LOCAL_RANK", 0)),
+                        help="GPU index for this process (set by torchrun)")
     
     args = parser.parse_args()
     
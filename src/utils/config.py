@@ -50,11 +50,26 @@ API_PORT = int(os.getenv("API_PORT", "8000"))
 
 # Inference settings
 CONFIDENCE_THRESHOLD = 0.5
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "8"))
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "2"))
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-# Create directories if they don't exist
-for directory in [DATA_DIR, MODELS_DIR, LOGS_DIR, RAW_DATA_DIR, PROCESSED_DATA_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+
+def ensure_dirs(directories: List[Path] = None):
+    """
+    Create project directories if they don't exist
+    
+    Called by code that writes to them, so importing the config stays free
+    of filesystem side effects.
+    
+    Args:
+        directories: Directories to create (defaults to all project data/model/log dirs)
+    """
+    if directories is None:
+        directories = [DATA_DIR, MODELS_DIR, LOGS_DIR, RAW_DATA_DIR, PROCESSED_DATA_DIR]
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
@@ -2,22 +2,23 @@
 Utility functions for metrics calculation
 """
 import numpy as np
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    confusion_matrix,
-    classification_report,
-)
+from sklearn.metrics import classification_report
 from typing import Dict, Tuple
+import matplotlib
+
+# Non-interactive backend: figures are only written to files and MLflow
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import seaborn as sns
 
 
 def calculate_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
     """
-    Calculate classification metrics
+    Calculate binary classification metrics (positive class = 1)
+    
+    All four metrics come from one 2x2 confusion matrix; undefined ratios
+    are reported as 0.
     
     Args:
         y_true: True labels
@@ -26,27 +27,42 @@ def calculate_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float
     Returns:
         Dictionary containing accuracy, precision, recall, and f1 score
     """
+    tn, fp, fn, tp = get_confusion_matrix(y_true, y_pred, num_classes=2).ravel().tolist()
+    
+    def _ratio(numerator, denominator):
+        return numerator / denominator if denominator > 0 else 0.0
+    
     metrics = {
-        "accuracy": accuracy_score(y_true, y_pred),
-        "precision": precision_score(y_true, y_pred, average="binary", zero_division=0),
-        "recall": recall_score(y_true, y_pred, average="binary", zero_division=0),
-        "f1_score": f1_score(y_true, y_pred, average="binary", zero_division=0),
+        "accuracy": _ratio(tp + tn, tp + tn + fp + fn),
+        "precision": _ratio(tp, tp + fp),
+        "recall": _ratio(tp, tp + fn),
+        "f1_score": _ratio(2 * tp, 2 * tp + fp + fn),
     }
     return metrics
 
 
-def get_confusion_matrix(y_true: np.ndarray, y_pred: np.ndarray) -> np.ndarray:
+def get_confusion_matrix(
+    y_true: np.ndarray, y_pred: np.ndarray, num_classes: int = None
+) -> np.ndarray:
     """
     Calculate confusion matrix
     
     Args:
-        y_true: True labels
-        y_pred: Predicted labels
+        y_true: True labels (integer class indices)
+        y_pred: Predicted labels (integer class indices)
+        num_classes: Number of classes (inferred from the labels if None, at least 2)
         
     Returns:
-        Confusion matrix as numpy array
+        Confusion matrix as numpy array (rows: actual, columns: predicted)
     """
-    return confusion_matrix(y_true, y_pred)
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred, dtype=np.int64)
+    if num_classes is None:
+        num_classes = max(2, int(max(y_true.max(initial=0), y_pred.max(initial=0))) + 1)
+    
+    # One bincount pass over the flattened (actual, predicted) cell index
+    cm = np.bincount(y_true * num_classes + y_pred, minlength=num_classes * num_classes)
+    return cm.reshape(num_classes, num_classes)
 
 
 def plot_confusion_matrix(
@@ -78,8 +94,10 @@ def plot_confusion_matrix(
     ax.set_title("Confusion Matrix")
     
     if save_path:
-        plt.savefig(save_path)
+        fig.savefig(save_path)
     
+    # Release pyplot's reference; the returned figure can still be saved
+    plt.close(fig)
     return fig
 
 
@@ -116,11 +134,13 @@ def plot_training_history(
     ax2.legend()
     ax2.grid(True)
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     if save_path:
-        plt.savefig(save_path)
+        fig.savefig(save_path)
     
+    # Release pyplot's reference; the returned figure can still be saved
+    plt.close(fig)
     return fig
 
 
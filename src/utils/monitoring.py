@@ -1,17 +1,28 @@
 """
 Enhanced monitoring module for the inference service
 """
+import atexit
 import logging
 import time
 from datetime import datetime
 from functools import wraps
 from pathlib import Path
 import json
+import queue
+import sys
+import threading
 from typing import Dict, Any
 
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import CLASS_NAMES, LOGS_DIR, ensure_dirs
+
 # Configure logging
-LOG_DIR = Path(__file__).parent.parent.parent / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+LOG_DIR = LOGS_DIR
+ensure_dirs([LOG_DIR])
 
 # Create logger
 logger = logging.getLogger("mlops_monitor")
@@ -41,12 +52,33 @@ logger.addHandler(console_handler)
 class RequestLogger:
     """
     Logger for API requests and responses
+    
+    The JSONL file is opened once and written through a 64 KB buffer;
+    it is flushed and closed at interpreter exit or via close(). Without
+    an explicit log_file, records go to a daily file that is switched
+    when the date changes.
     """
     
     def __init__(self, log_file: str = None):
-        if log_file is None:
-            log_file = LOG_DIR / f"requests_{datetime.now().strftime('%Y%m%d')}.json"
+        self._daily = log_file is None
+        self._date = datetime.now().strftime('%Y%m%d')
+        if self._daily:
+            log_file = LOG_DIR / f"requests_{self._date}.json"
         self.log_file = Path(log_file)
+        self._fh = open(self.log_file, 'a', buffering=1 << 16)
+        atexit.register(self.close)
+    
+    def _rollover(self, date: str):
+        """
+        Close the current daily file and open the one for date
+        
+        Args:
+            date: New date as YYYYMMDD
+        """
+        self._fh.close()
+        self._date = date
+        self.log_file = LOG_DIR / f"requests_{date}.json"
+        self._fh = open(self.log_file, 'a', buffering=1 << 16)
     
     def log_request(self, request_data: Dict[str, Any]):
         """
@@ -55,27 +87,92 @@ class RequestLogger:
         Args:
             request_data: Dictionary containing request information
         """
-        with open(self.log_file, 'a') as f:
-            json.dump(request_data, f)
-            f.write('\n')
+        if self._daily:
+            date = datetime.now().strftime('%Y%m%d')
+            if date != self._date:
+                self._rollover(date)
+        self._fh.write(json.dumps(request_data) + '\n')
+    
+    def close(self):
+        """
+        Flush and close the log file
+        """
+        if not self._fh.closed:
+            self._fh.close()
+
+
+# Request log records are written by a background thread, off the request path
+_log_queue = queue.Queue(maxsize=10000)
+_log_thread = None
+_log_thread_lock = threading.Lock()
+
+
+def _log_writer(request_logger: RequestLogger):
+    """
+    Drain the request log queue into the JSONL file until a None sentinel
+    """
+    while True:
+        record = _log_queue.get()
+        if record is None:
+            break
+        request_logger.log_request(record)
+
+
+def _stop_log_writer():
+    """
+    Flush queued records before the interpreter exits
+    """
+    try:
+        _log_queue.put(None, timeout=1)
+    except queue.Full:
+        return
+    _log_thread.join(timeout=5)
+
+
+def enqueue_request_log(request_data: Dict[str, Any]):
+    """
+    Queue a request record for the background writer
+    
+    Records are dropped (with a warning) when the queue is full rather
+    than blocking the caller.
+    
+    Args:
+        request_data: Dictionary containing request information
+    """
+    global _log_thread
+    if _log_thread is None:
+        with _log_thread_lock:
+            if _log_thread is None:
+                _log_thread = threading.Thread(
+                    target=_log_writer,
+                    args=(get_request_logger(),),
+                    name="request-log-writer",
+                    daemon=True,
+                )
+                _log_thread.start()
+                # Registered after the logger's close(), so this runs first at exit
+                atexit.register(_stop_log_writer)
+    
+    try:
+        _log_queue.put_nowait(request_data)
+    except queue.Full:
+        logger.warning("Request log queue full, dropping record")
 
 
 class PerformanceMonitor:
     """
     Monitor for tracking performance metrics
+    
+    Inference times are kept in a fixed-size ring buffer, so averages cover
+    the most recent WINDOW_SIZE requests.
     """
     
+    WINDOW_SIZE = 8192  # power of two so the write index wraps with a mask
+    
     def __init__(self):
-        self.metrics = {
-            "request_count": 0,
-            "total_inference_time": 0.0,
-            "errors": 0,
-            "predictions": {
-                "cat": 0,
-                "dog": 0
-            }
-        }
         self.metrics_file = LOG_DIR / "metrics.json"
+        self._class_index = {name: i for i, name in enumerate(CLASS_NAMES)}
+        self.reset_metrics()
     
     def record_request(self, inference_time: float, predicted_class: str, success: bool = True):
         """
@@ -86,14 +183,17 @@ class PerformanceMonitor:
             predicted_class: Predicted class
             success: Whether request was successful
         """
-        self.metrics["request_count"] += 1
-        self.metrics["total_inference_time"] += inference_time
+        self._times[self._idx] = inference_time
+        self._idx = (self._idx + 1) & (self.WINDOW_SIZE - 1)
+        self._count += 1
+        self._total_time += inference_time
         
         if not success:
-            self.metrics["errors"] += 1
+            self._errors += 1
         else:
-            if predicted_class in self.metrics["predictions"]:
-                self.metrics["predictions"][predicted_class] += 1
+            class_idx = self._class_index.get(predicted_class)
+            if class_idx is not None:
+                self._pred_counts[class_idx] += 1
     
     def get_metrics(self) -> Dict[str, Any]:
         """
@@ -102,20 +202,15 @@ class PerformanceMonitor:
         Returns:
             Dictionary of metrics
         """
-        avg_time = (
-            self.metrics["total_inference_time"] / self.metrics["request_count"]
-            if self.metrics["request_count"] > 0
-            else 0
-        )
+        window = self._times[:min(self._count, self.WINDOW_SIZE)]
         
         return {
-            **self.metrics,
-            "average_inference_time": avg_time,
-            "error_rate": (
-                self.metrics["errors"] / self.metrics["request_count"]
-                if self.metrics["request_count"] > 0
-                else 0
-            )
+            "request_count": self._count,
+            "total_inference_time": self._total_time,
+            "errors": self._errors,
+            "predictions": dict(zip(CLASS_NAMES, self._pred_counts.tolist())),
+            "average_inference_time": float(window.mean()) if self._count > 0 else 0,
+            "error_rate": self._errors / self._count if self._count > 0 else 0
         }
     
     def save_metrics(self):
@@ -129,15 +224,12 @@ class PerformanceMonitor:
         """
         Reset all metrics
         """
-        self.metrics = {
-            "request_count": 0,
-            "total_inference_time": 0.0,
-            "errors": 0,
-            "predictions": {
-                "cat": 0,
-                "dog": 0
-            }
-        }
+        self._times = np.zeros(self.WINDOW_SIZE, dtype=np.float32)
+        self._idx = 0
+        self._count = 0
+        self._total_time = 0.0
+        self._errors = 0
+        self._pred_counts = np.zeros(len(CLASS_NAMES), dtype=np.int64)
 
 
 def log_prediction(func):
@@ -147,7 +239,6 @@ def log_prediction(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
         start_time = time.time()
-        request_logger = RequestLogger()
         
         try:
             result = await func(*args, **kwargs)
@@ -161,7 +252,7 @@ def log_prediction(func):
                 "confidence": result.get("confidence"),
                 "success": True
             }
-            request_logger.log_request(log_data)
+            enqueue_request_log(log_data)
             
             logger.info(
                 f"Prediction: {result.get('predicted_class')} "
@@ -181,7 +272,7 @@ def log_prediction(func):
                 "error": str(e),
                 "success": False
             }
-            request_logger.log_request(log_data)
+            enqueue_request_log(log_data)
             
             logger.error(f"Prediction error: {e}")
             raise
@@ -192,6 +283,9 @@ def log_prediction(func):
 # Global performance monitor instance
 performance_monitor = PerformanceMonitor()
 
+# Shared request logger, created on first use so importing doesn't open files
+_request_logger = None
+
 
 def get_logger():
     """
@@ -203,6 +297,19 @@ def get_logger():
     return logger
 
 
+def get_request_logger():
+    """
+    Get the shared request logger
+    
+    Returns:
+        RequestLogger instance
+    """
+    global _request_logger
+    if _request_logger is None:
+        _request_logger = RequestLogger()
+    return _request_logger
+
+
 def get_performance_monitor():
     """
     Get the performance monitor
@@ -0,0 +1,32 @@
+"""
+Shared pytest fixtures
+"""
+import pytest
+from PIL import Image
+import torch
+
+from src.inference.predictor import CatDogPredictor
+from src.models.cnn_model import get_model
+from src.utils.config import NUM_CLASSES
+
+
+@pytest.fixture(scope='session')
+def create_test_image(tmp_path_factory):
+    """Create a test image once per session"""
+    image_path = tmp_path_factory.mktemp("images") / "test_image.jpg"
+    Image.new('RGB', (300, 300), color='blue').save(image_path)
+    return str(image_path)
+
+
+@pytest.fixture(scope='session')
+def create_test_model(tmp_path_factory):
+    """Create a test model and save it once per session"""
+    model_path = tmp_path_factory.mktemp("models") / "test_model.pt"
+    torch.save(get_model(num_classes=NUM_CLASSES).state_dict(), model_path)
+    return str(model_path)
+
+
+@pytest.fixture(scope='session')
+def predictor(create_test_model):
+    """CPU predictor shared by tests that only run inference"""
+    return CatDogPredictor(model_path=create_test_model, device='cpu')
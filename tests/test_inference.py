@@ -1,44 +1,26 @@
 """
 Unit tests for inference functions
 """
+import asyncio
+import threading
 import pytest
 import numpy as np
 from PIL import Image
-import tempfile
 from pathlib import Path
-import sys
 import torch
 
-sys.path.append(str(Path(__file__).parent.parent))
-
-from src.inference.predictor import CatDogPredictor
-from src.models.cnn_model import get_model
+from src.inference.batching import MicroBatcher
+from src.inference.predictor import CatDogPredictor, decode_image_bytes
+from src.models.cnn_model import get_model, fuse_conv_bn
+from src.models.quantize import quantize_model
+from src.models.onnx_export import export_onnx
+from src.data.augmentation import get_inference_transforms, get_val_transforms
 from src.utils.config import IMG_SIZE, NUM_CLASSES, MODELS_DIR
 
 
 class TestInference:
     """Test inference functions"""
     
-    @pytest.fixture
-    def create_test_image(self):
-        """Create a temporary test image"""
-        img = Image.new('RGB', (300, 300), color='blue')
-        temp_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-        img.save(temp_file.name)
-        temp_file.close()
-        yield temp_file.name
-        Path(temp_file.name).unlink()
-    
-    @pytest.fixture
-    def create_test_model(self):
-        """Create a test model and save it"""
-        model = get_model(num_classes=NUM_CLASSES)
-        temp_model = tempfile.NamedTemporaryFile(suffix='.pt', delete=False)
-        torch.save(model.state_dict(), temp_model.name)
-        temp_model.close()
-        yield temp_model.name
-        Path(temp_model.name).unlink()
-    
     def test_model_architecture(self):
         """Test if model has correct architecture"""
         model = get_model(num_classes=NUM_CLASSES)
@@ -56,33 +38,74 @@ class TestInference:
         assert predictor.model is not None
         assert predictor.device == torch.device('cpu')
     
-    def test_preprocess_image_from_path(self, create_test_model, create_test_image):
+    def test_predictor_loads_flatten_checkpoint(self, tmp_path, create_test_image):
+        """Test if predictor still loads checkpoints without global pooling"""
+        model_path = tmp_path / "legacy_model.pt"
+        torch.save(get_model(num_classes=NUM_CLASSES, global_pool=False).state_dict(), model_path)
+        
+        predictor = CatDogPredictor(model_path=str(model_path), device='cpu')
+        result = predictor.predict(create_test_image)
+        
+        assert predictor.model.fc1.in_features == 256 * 14 * 14
+        assert 0.0 <= result['confidence'] <= 1.0
+    
+    def test_predictor_loads_quantized_model(self, tmp_path, create_test_image):
+        """Test if predictor runs an int8 quantized model"""
+        calibration_data = [(torch.randn(2, 3, IMG_SIZE[0], IMG_SIZE[1]), None)]
+        quantized = quantize_model(get_model(num_classes=NUM_CLASSES), calibration_data, num_batches=1)
+        model_path = tmp_path / "model.int8.pt"
+        torch.jit.save(quantized, str(model_path))
+        
+        predictor = CatDogPredictor(model_path=str(model_path))
+        result = predictor.predict(create_test_image)
+        
+        assert predictor.device == torch.device('cpu')
+        assert abs(sum(result['probabilities'].values()) - 1.0) < 0.01
+    
+    def test_predictor_loads_onnx_model(self, tmp_path, create_test_image):
+        """Test if predictor runs an exported ONNX model"""
+        pytest.importorskip("onnxruntime")
+        model_path = tmp_path / "model.onnx"
+        export_onnx(get_model(num_classes=NUM_CLASSES), model_path)
+        
+        predictor = CatDogPredictor(model_path=str(model_path))
+        results = predictor.predict_batch([create_test_image] * 2)
+        
+        assert predictor.device == torch.device('cpu')
+        assert all(abs(sum(r['probabilities'].values()) - 1.0) < 0.01 for r in results)
+    
+    def test_preprocess_image_from_path(self, predictor, create_test_image):
         """Test image preprocessing from file path"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
         tensor = predictor.preprocess_image(create_test_image)
         
         assert tensor.shape == (1, 3, IMG_SIZE[0], IMG_SIZE[1])
         assert isinstance(tensor, torch.Tensor)
     
-    def test_preprocess_image_from_pil(self, create_test_model):
+    def test_preprocess_image_from_pil(self, predictor):
         """Test image preprocessing from PIL Image"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
         img = Image.new('RGB', (300, 300), color='green')
         tensor = predictor.preprocess_image(img)
         
         assert tensor.shape == (1, 3, IMG_SIZE[0], IMG_SIZE[1])
     
-    def test_preprocess_image_from_numpy(self, create_test_model):
+    def test_preprocess_image_from_numpy(self, predictor):
         """Test image preprocessing from numpy array"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
         img_array = np.random.randint(0, 255, (300, 300, 3), dtype=np.uint8)
         tensor = predictor.preprocess_image(img_array)
         
         assert tensor.shape == (1, 3, IMG_SIZE[0], IMG_SIZE[1])
     
-    def test_predict_output_format(self, create_test_model, create_test_image):
+    def test_preprocess_image_from_bytes(self, predictor, create_test_image):
+        """Test image preprocessing from encoded bytes decoded to a uint8 tensor"""
+        image = decode_image_bytes(Path(create_test_image).read_bytes())
+        tensor = predictor.preprocess_image(image)
+        
+        assert image.dtype == torch.uint8
+        assert image.shape == (3, 300, 300)
+        assert tensor.shape == (1, 3, IMG_SIZE[0], IMG_SIZE[1])
+    
+    def test_predict_output_format(self, predictor, create_test_image):
         """Test if prediction output has correct format"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
         result = predictor.predict(create_test_image)
         
         # Check required keys
@@ -97,25 +120,21 @@ class TestInference:
         assert isinstance(result['class_index'], int)
         assert isinstance(result['probabilities'], dict)
     
-    def test_predict_confidence_range(self, create_test_model, create_test_image):
+    def test_predict_confidence_range(self, predictor, create_test_image):
         """Test if confidence is in valid range [0, 1]"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
         result = predictor.predict(create_test_image)
         
         assert 0.0 <= result['confidence'] <= 1.0
     
-    def test_predict_probabilities_sum(self, create_test_model, create_test_image):
+    def test_predict_probabilities_sum(self, predictor, create_test_image):
         """Test if probabilities sum to approximately 1"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
         result = predictor.predict(create_test_image)
         
         prob_sum = sum(result['probabilities'].values())
         assert abs(prob_sum - 1.0) < 0.01  # Allow small floating point error
     
-    def test_predict_batch(self, create_test_model, create_test_image):
+    def test_predict_batch(self, predictor, create_test_image):
         """Test batch prediction"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
-        
         # Create multiple test images
         images = [create_test_image] * 3
         results = predictor.predict_batch(images)
@@ -123,10 +142,31 @@ class TestInference:
         assert len(results) == 3
         assert all('predicted_class' in r for r in results)
     
-    def test_model_eval_mode(self, create_test_model):
+    def test_fused_transform_matches_val_transforms(self):
+        """Test if fused inference preprocessing matches the validation pipeline"""
+        img = Image.fromarray(np.random.randint(0, 255, (300, 400, 3), dtype=np.uint8))
+        expected = get_val_transforms(IMG_SIZE)(img)
+        tensor = get_inference_transforms(IMG_SIZE)(torch.from_numpy(np.array(img)).permute(2, 0, 1))
+        
+        assert tensor.shape == (1, 3, IMG_SIZE[0], IMG_SIZE[1])
+        assert torch.allclose(tensor[0], expected, atol=0.05)
+    
+    def test_compile_failure_keeps_eager_transform(self, predictor, monkeypatch):
+        """Test if a preprocessor that fails on its first compiled call falls back to eager"""
+        def broken_compile(module, **kwargs):
+            def compiled(*args):
+                raise RuntimeError("no working compiler")
+            return compiled
+        
+        monkeypatch.setattr(torch, "compile", broken_compile)
+        transform = get_inference_transforms(IMG_SIZE)
+        
+        assert predictor._compile_transform(transform) is transform
+    
+    def test_model_eval_mode(self, predictor):
         """Test if model is in evaluation mode"""
-        predictor = CatDogPredictor(model_path=create_test_model, device='cpu')
         assert not predictor.model.training
+        assert not any(p.requires_grad for p in predictor.model.parameters())
 
 
 class TestModelUtilities:
@@ -152,8 +192,114 @@ class TestModelUtilities:
         model = get_model(dropout=0.3)
         assert model is not None
     
+    def test_fuse_conv_bn_preserves_output(self):
+        """Test if folding BatchNorm into conv keeps the eval-mode output"""
+        model = get_model()
+        model.eval()
+        dummy_input = torch.randn(2, 3, IMG_SIZE[0], IMG_SIZE[1])
+        
+        with torch.no_grad():
+            expected = model(dummy_input)
+            fused_output = fuse_conv_bn(model)(dummy_input)
+        
+        assert isinstance(model.bn1, torch.nn.Identity)
+        assert torch.allclose(fused_output, expected, atol=1e-5)
+    
     def test_model_parameters_trainable(self):
         """Test if model parameters are trainable"""
         model = get_model()
         trainable = sum(p.numel() for p in model.parameters() if p.requires_grad)
         assert trainable > 0
+
+
+class RecordingPredictor:
+    """Stand-in predictor that records batch sizes and echoes each row's first value"""
+    
+    def __init__(self, release=None):
+        self.batch_sizes = []
+        self.release = release
+    
+    def predict_tensor(self, tensor):
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        self.batch_sizes.append(tensor.shape[0])
+        return [{"value": row.flatten()[0].item()} for row in tensor]
+
+
+class TestMicroBatcher:
+    """Test request micro-batching"""
+    
+    def test_coalesces_concurrent_requests(self):
+        """Test if concurrent submits share one forward pass and keep their own results"""
+        predictor = RecordingPredictor()
+        
+        async def run():
+            batcher = MicroBatcher(predictor, max_batch_size=8, max_wait_ms=50)
+            batcher.start()
+            results = await asyncio.gather(
+                *(batcher.submit(torch.full((1, 3, 2, 2), float(i))) for i in range(4))
+            )
+            await batcher.stop()
+            return results
+        
+        results = asyncio.run(run())
+        
+        assert predictor.batch_sizes == [4]
+        assert [r["value"] for r in results] == [0.0, 1.0, 2.0, 3.0]
+    
+    def test_failed_batch_propagates_and_loop_continues(self):
+        """Test if a bad batch fails its own requests without stopping the batcher"""
+        predictor = RecordingPredictor()
+        
+        async def run():
+            batcher = MicroBatcher(predictor, max_batch_size=8, max_wait_ms=50)
+            batcher.start()
+            # Mismatched shapes make torch.cat fail for the whole batch
+            bad = await asyncio.gather(
+                batcher.submit(torch.zeros(1, 3, 2, 2)),
+                batcher.submit(torch.zeros(1, 3, 4, 4)),
+                return_exceptions=True,
+            )
+            good = await asyncio.wait_for(batcher.submit(torch.ones(1, 3, 2, 2)), timeout=5)
+            await batcher.stop()
+            return bad, good
+        
+        bad, good = asyncio.run(run())
+        
+        assert all(isinstance(e, RuntimeError) for e in bad)
+        assert good["value"] == 1.0
+    
+    def test_stop_fails_waiting_requests(self):
+        """Test if stop() resolves in-flight and queued requests with an error"""
+        release = threading.Event()
+        predictor = RecordingPredictor(release=release)
+        
+        async def run():
+            batcher = MicroBatcher(predictor, max_batch_size=1, max_wait_ms=1)
+            batcher.start()
+            in_flight = asyncio.ensure_future(batcher.submit(torch.zeros(1, 3, 2, 2)))
+            queued = asyncio.ensure_future(batcher.submit(torch.zeros(1, 3, 2, 2)))
+            await asyncio.sleep(0.05)
+            await batcher.stop()
+            release.set()
+            return await asyncio.wait_for(
+                asyncio.gather(in_flight, queued, return_exceptions=True), timeout=5
+            )
+        
+        results = asyncio.run(run())
+        
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert all("stopped" in str(r) for r in results)
+    
+    def test_submit_after_stop_raises(self):
+        """Test if submit() refuses work once the batcher is stopped"""
+        predictor = RecordingPredictor()
+        
+        async def run():
+            batcher = MicroBatcher(predictor)
+            batcher.start()
+            await batcher.stop()
+            await asyncio.wait_for(batcher.submit(torch.zeros(1, 3, 2, 2)), timeout=5)
+        
+        with pytest.raises(RuntimeError, match="not running"):
+            asyncio.run(run())
@@ -0,0 +1,69 @@
+"""
+Unit tests for metrics utilities
+"""
+import pytest
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score,
+    confusion_matrix,
+    f1_score,
+    precision_score,
+    recall_score,
+)
+
+from src.utils.metrics import calculate_metrics, get_confusion_matrix
+
+
+def sklearn_metrics(y_true, y_pred):
+    """Reference metrics, with undefined ratios reported as 0 like calculate_metrics"""
+    return {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, zero_division=0),
+        "recall": recall_score(y_true, y_pred, zero_division=0),
+        "f1_score": f1_score(y_true, y_pred, zero_division=0),
+    }
+
+
+class TestMetrics:
+    """Test metrics against scikit-learn"""
+    
+    @pytest.mark.parametrize("seed", range(5))
+    def test_calculate_metrics_matches_sklearn(self, seed):
+        """Test if metrics on random binary labels match scikit-learn"""
+        rng = np.random.default_rng(seed)
+        y_true = rng.integers(0, 2, size=200)
+        y_pred = rng.integers(0, 2, size=200)
+        
+        assert calculate_metrics(y_true, y_pred) == pytest.approx(sklearn_metrics(y_true, y_pred))
+    
+    @pytest.mark.parametrize(
+        "y_true, y_pred",
+        [
+            ([0, 1, 1, 0], [0, 0, 0, 0]),  # no positive predictions
+            ([0, 0, 0, 0], [0, 1, 1, 0]),  # no positive labels
+            ([0, 0, 0, 0], [0, 0, 0, 0]),  # neither
+            ([1, 1, 1, 1], [1, 1, 1, 1]),  # single class, all correct
+        ],
+    )
+    def test_calculate_metrics_zero_division(self, y_true, y_pred):
+        """Test if undefined precision/recall/F1 are reported as 0 like scikit-learn"""
+        y_true, y_pred = np.array(y_true), np.array(y_pred)
+        
+        assert calculate_metrics(y_true, y_pred) == pytest.approx(sklearn_metrics(y_true, y_pred))
+    
+    @pytest.mark.parametrize("num_classes", [2, 5])
+    def test_confusion_matrix_matches_sklearn(self, num_classes):
+        """Test if the bincount confusion matrix matches scikit-learn"""
+        rng = np.random.default_rng(num_classes)
+        y_true = rng.integers(0, num_classes, size=300)
+        y_pred = rng.integers(0, num_classes, size=300)
+        expected = confusion_matrix(y_true, y_pred, labels=range(num_classes))
+        
+        np.testing.assert_array_equal(get_confusion_matrix(y_true, y_pred), expected)
+        np.testing.assert_array_equal(get_confusion_matrix(y_true, y_pred, num_classes), expected)
+    
+    def test_confusion_matrix_keeps_missing_classes(self):
+        """Test if classes absent from both arrays still get a row and column"""
+        cm = get_confusion_matrix(np.zeros(4, dtype=int), np.zeros(4, dtype=int), num_classes=2)
+        
+        np.testing.assert_array_equal(cm, [[4, 0], [0, 0]])
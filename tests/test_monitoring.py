@@ -0,0 +1,56 @@
+"""
+Unit tests for monitoring utilities
+"""
+import json
+from datetime import datetime
+
+import src.utils.monitoring as monitoring
+from src.utils.monitoring import RequestLogger
+
+
+class FakeClock:
+    """Stand-in for datetime whose now() can be moved forward"""
+    
+    def __init__(self, now):
+        self.current = now
+    
+    def now(self):
+        return self.current
+
+
+class TestRequestLogger:
+    """Test request logging"""
+    
+    def test_daily_file_rolls_over_at_midnight(self, tmp_path, monkeypatch):
+        """Test if records written after midnight go to the new day's file"""
+        clock = FakeClock(datetime(2024, 1, 1, 23, 59))
+        monkeypatch.setattr(monitoring, "LOG_DIR", tmp_path)
+        monkeypatch.setattr(monitoring, "datetime", clock)
+        
+        request_logger = RequestLogger()
+        request_logger.log_request({"id": 1})
+        clock.current = datetime(2024, 1, 2, 0, 1)
+        request_logger.log_request({"id": 2})
+        request_logger.close()
+        
+        def ids(name):
+            lines = (tmp_path / name).read_text().splitlines()
+            return [json.loads(line)["id"] for line in lines]
+        
+        assert ids("requests_20240101.json") == [1]
+        assert ids("requests_20240102.json") == [2]
+        assert request_logger.log_file == tmp_path / "requests_20240102.json"
+    
+    def test_explicit_log_file_is_kept(self, tmp_path, monkeypatch):
+        """Test if a caller-chosen log file is never rolled over"""
+        clock = FakeClock(datetime(2024, 1, 1, 23, 59))
+        monkeypatch.setattr(monitoring, "datetime", clock)
+        log_file = tmp_path / "requests.json"
+        
+        request_logger = RequestLogger(log_file)
+        request_logger.log_request({"id": 1})
+        clock.current = datetime(2024, 1, 2, 0, 1)
+        request_logger.log_request({"id": 2})
+        request_logger.close()
+        
+        assert len(log_file.read_text().splitlines()) == 2
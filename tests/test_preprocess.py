@@ -1,71 +1,162 @@
 """
 Unit tests for data preprocessing functions
 """
+import hashlib
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
 import pytest
 import numpy as np
 from PIL import Image
-import tempfile
 from pathlib import Path
-import sys
-
-sys.path.append(str(Path(__file__).parent.parent))
 
+import src.data.preprocess as preprocess
 from src.data.preprocess import load_and_preprocess_image, split_dataset
 from src.utils.config import IMG_SIZE
 
+# Raw RGB pixels for the 300x300 red test image
+RED_IMAGE_SIZE = (300, 300)
+RED_PIXELS = bytes([255, 0, 0]) * (RED_IMAGE_SIZE[0] * RED_IMAGE_SIZE[1])
+
+# Complete 1x1 black 24-bit BMP (58 bytes), used as split-dataset placeholder content
+PLACEHOLDER_BMP = bytes.fromhex(
+    "424d3a000000000000003600000028000000010000000100000001001800000000"
+    "0004000000c40e0000c40e0000000000000000000000000000"
+)
+
+HAS_BENCHMARK = importlib.util.find_spec("pytest_benchmark") is not None
+
+# Generous upper bound on mean decode+resize+normalize time for the 300x300 test
+# image; catches order-of-magnitude regressions without flaking on slow CI runners
+PREPROCESS_MEAN_THRESHOLD_S = 0.02
+
+
+@pytest.fixture(scope='session')
+def red_jpeg_bytes():
+    """Encode a red JPEG once; tests write these bytes instead of re-encoding"""
+    img = Image.frombytes('RGB', RED_IMAGE_SIZE, RED_PIXELS)
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='session')
+def create_test_image(tmp_path_factory, red_jpeg_bytes):
+    """Create a temporary test image shared by the read-only load tests"""
+    image_path = tmp_path_factory.mktemp("images") / "red.jpg"
+    image_path.write_bytes(red_jpeg_bytes)
+    return str(image_path)
+
+
+@pytest.fixture(scope='session')
+def loaded_array(request, create_test_image, red_jpeg_bytes):
+    """
+    Load and preprocess the test image once for the output checks
+    
+    The result is persisted in the pytest cache and reused by later runs.
+    The cache key covers the input bytes, the preprocessing source, the
+    OpenCV version and IMG_SIZE, so any change to them recomputes it.
+    """
+    cache = getattr(request.config, "cache", None)
+    if cache is None:
+        return load_and_preprocess_image(create_test_image, IMG_SIZE)
+    
+    key = hashlib.sha256(
+        red_jpeg_bytes
+        + Path(preprocess.__file__).read_bytes()
+        + f"{preprocess.cv2.__version__}{IMG_SIZE}".encode()
+    ).hexdigest()[:16]
+    cache_dir = cache.mkdir("preprocess")
+    cache_path = cache_dir / f"red_{key}.npy"
+    if cache_path.exists():
+        return np.load(cache_path)
+    
+    img_array = load_and_preprocess_image(create_test_image, IMG_SIZE)
+    # xdist workers may race on a cold cache: publish atomically, and never
+    # remove the entry another worker is writing or reading for this key
+    for stale in cache_dir.glob("red_*.npy"):
+        if stale != cache_path:
+            stale.unlink(missing_ok=True)
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as tmp:
+        np.save(tmp, img_array)
+    os.replace(tmp.name, cache_path)
+    return img_array
+
+
+def make_dataset(directory, num_files, image_bytes):
+    """Write one image and hardlink the rest; split_dataset only reads file names"""
+    first = directory / "image_0.bmp"
+    first.write_bytes(image_bytes)
+    for i in range(1, num_files):
+        target = directory / f"image_{i}.bmp"
+        try:
+            os.link(first, target)
+        except OSError:
+            # Filesystems without hardlink support
+            shutil.copyfile(first, target)
+
+
+@pytest.fixture(scope='session')
+def dataset_dir(tmp_path_factory):
+    """100-image directory shared by the split tests (split_dataset never writes to it)"""
+    directory = tmp_path_factory.mktemp("dataset")
+    make_dataset(directory, 100, PLACEHOLDER_BMP)
+    return directory
+
+
+@pytest.fixture
+def listed_dataset_dir(monkeypatch):
+    """Stub the directory listing so split tests run without touching the filesystem"""
+    directory = Path("in_memory_dataset")
+    # Fresh list per call: split_dataset shuffles it in place
+    monkeypatch.setattr(
+        "src.data.preprocess.get_image_files",
+        lambda _: [directory / f"image_{i}.bmp" for i in range(100)],
+    )
+    return directory
+
 
 class TestPreprocessing:
     """Test data preprocessing functions"""
     
-    @pytest.fixture
-    def create_test_image(self):
-        """Create a temporary test image"""
-        # Create a temporary image
-        img = Image.new('RGB', (300, 300), color='red')
-        temp_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-        img.save(temp_file.name)
-        temp_file.close()
-        yield temp_file.name
-        # Cleanup
-        Path(temp_file.name).unlink()
-    
-    def test_load_and_preprocess_image_shape(self, create_test_image):
+    def test_load_and_preprocess_image_shape(self, loaded_array):
         """Test if image is preprocessed to correct shape"""
-        img_array = load_and_preprocess_image(create_test_image, IMG_SIZE)
-        
-        assert img_array is not None
-        assert img_array.shape == (IMG_SIZE[0], IMG_SIZE[1], 3)
+        assert loaded_array is not None
+        assert loaded_array.shape == (IMG_SIZE[0], IMG_SIZE[1], 3)
     
-    def test_load_and_preprocess_image_normalization(self, create_test_image):
+    def test_load_and_preprocess_image_normalization(self, loaded_array):
         """Test if image values are normalized to [0, 1]"""
-        img_array = load_and_preprocess_image(create_test_image, IMG_SIZE)
-        
-        assert img_array is not None
-        assert img_array.min() >= 0.0
-        assert img_array.max() <= 1.0
+        assert loaded_array is not None
+        assert loaded_array.min() >= 0.0
+        assert loaded_array.max() <= 1.0
     
-    def test_load_and_preprocess_image_type(self, create_test_image):
-        """Test if output is numpy array"""
-        img_array = load_and_preprocess_image(create_test_image, IMG_SIZE)
+    def test_load_and_preprocess_image_type(self, loaded_array):
+        """Test if output is a float32 numpy array"""
+        assert isinstance(loaded_array, np.ndarray)
+        # float32 exactly: a silent float64 promotion doubles memory traffic downstream
+        assert loaded_array.dtype == np.float32
+    
+    @pytest.mark.skipif(not HAS_BENCHMARK, reason="pytest-benchmark not installed")
+    def test_load_and_preprocess_image_perf(self, benchmark, create_test_image):
+        """Guard load_and_preprocess_image against performance regressions"""
+        img_array = benchmark(load_and_preprocess_image, create_test_image, IMG_SIZE)
         
-        assert isinstance(img_array, np.ndarray)
-        assert img_array.dtype == np.float64 or img_array.dtype == np.float32
+        assert img_array is not None
+        # Timing is unavailable when benchmarking is disabled (e.g. under xdist)
+        if not benchmark.disabled:
+            assert benchmark.stats["mean"] < PREPROCESS_MEAN_THRESHOLD_S
     
     def test_load_nonexistent_image(self):
         """Test handling of nonexistent image"""
         result = load_and_preprocess_image("nonexistent_image.jpg")
         assert result is None
     
-    def test_split_dataset_ratios(self, tmp_path):
+    def test_split_dataset_ratios(self, dataset_dir):
         """Test if dataset split maintains correct ratios"""
-        # Create temporary dataset
-        for i in range(100):
-            img_file = tmp_path / f"image_{i}.jpg"
-            img = Image.new('RGB', (100, 100))
-            img.save(img_file)
-        
         train_files, val_files, test_files = split_dataset(
-            tmp_path, 
+            dataset_dir, 
             train_ratio=0.8, 
             val_ratio=0.1, 
             test_ratio=0.1
@@ -78,39 +169,21 @@ class TestPreprocessing:
         assert len(val_files) == 10
         assert len(test_files) == 10
     
-    def test_split_dataset_no_overlap(self, tmp_path):
+    def test_split_dataset_no_overlap(self, listed_dataset_dir):
         """Test if there's no overlap between splits"""
-        # Create temporary dataset
-        for i in range(30):
-            img_file = tmp_path / f"image_{i}.jpg"
-            img = Image.new('RGB', (100, 100))
-            img.save(img_file)
-        
-        train_files, val_files, test_files = split_dataset(tmp_path)
+        train_files, val_files, test_files = split_dataset(listed_dataset_dir)
         
-        # Convert to sets
-        train_set = set(train_files)
-        val_set = set(val_files)
-        test_set = set(test_files)
-        
-        # Check for no overlap
-        assert len(train_set.intersection(val_set)) == 0
-        assert len(train_set.intersection(test_set)) == 0
-        assert len(val_set.intersection(test_set)) == 0
+        # The union only loses elements if two splits share a file
+        all_files = set(train_files) | set(val_files) | set(test_files)
+        assert len(all_files) == len(train_files) + len(val_files) + len(test_files)
     
-    def test_split_dataset_reproducibility(self, tmp_path):
+    def test_split_dataset_reproducibility(self, listed_dataset_dir):
         """Test if split is reproducible with same seed"""
-        # Create temporary dataset
-        for i in range(50):
-            img_file = tmp_path / f"image_{i}.jpg"
-            img = Image.new('RGB', (100, 100))
-            img.save(img_file)
-        
         # First split
-        train1, val1, test1 = split_dataset(tmp_path, seed=42)
+        train1, val1, test1 = split_dataset(listed_dataset_dir, seed=42)
         
         # Second split with same seed
-        train2, val2, test2 = split_dataset(tmp_path, seed=42)
+        train2, val2, test2 = split_dataset(listed_dataset_dir, seed=42)
         
         # Should be identical
         assert train1 == train2